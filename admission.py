@@ -0,0 +1,164 @@
+# admission.py
+
+from collections import OrderedDict
+from flask import request, session, jsonify, make_response, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+import logging
+import math
+import threading
+import time
+
+
+class TokenBucket:
+    """Корзина маркеров: rate маркеров в секунду, не более capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, now=None):
+        """Списывает маркер. Возвращает 0 при успехе или число секунд до появления маркера."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Набор корзин маркеров по ключу (пользователь или IP).
+
+    Хранится не больше max_keys корзин: при переполнении забывается та, к которой
+    дольше всего не обращались.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, rate, capacity):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.consume()
+
+
+class ConcurrencyLimiter:
+    """Ограничение числа одновременно обрабатываемых запросов без очереди.
+
+    Обычные запросы могут занять не больше limit - reserved мест,
+    приоритетные - все limit.
+    """
+
+    def __init__(self, limit, reserved=0):
+        self.limit = limit
+        self.reserved = min(reserved, max(limit - 1, 0))
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, priority=False):
+        allowed = self.limit if priority else self.limit - self.reserved
+        with self._lock:
+            if self.active >= allowed:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+
+def priority(view):
+    """Помечает маршрут как приоритетный (бронирования, администрирование)."""
+    view.admission_priority = True
+    return view
+
+
+def exempt(view):
+    """Маршрут не занимает место в лимите одновременных запросов (долгие потоки без БД)."""
+    view.admission_exempt = True
+    return view
+
+
+def _client_key():
+    """Ключ для лимита: пользователь из JWT или сессии, иначе IP-адрес."""
+    if request.path.startswith('/api/'):
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        if identity:
+            return f"user:{identity}"
+    user = session.get('user')
+    if user:
+        return f"user:{user['id']}"
+    return None
+
+
+def _reject(status, message, retry_after):
+    if request.path.startswith('/api/'):
+        response = jsonify({'msg': message})
+    else:
+        response = make_response(message)
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def init_admission_control(app):
+    config = app.config
+    limiter = RateLimiter()
+    concurrency = ConcurrencyLimiter(config['MAX_CONCURRENT_REQUESTS'],
+                                     config['PRIORITY_RESERVED_SLOTS'])
+
+    def _worker_share(rate, burst):
+        # Каждый воркер считает запросы независимо: его доля - 1/N лимита,
+        # но в корзине остается хотя бы один маркер
+        workers = max(config['RATE_LIMIT_WORKERS'], 1)
+        return rate / workers, max(burst / workers, 1)
+
+    @app.before_request
+    def admit_request():
+        view = app.view_functions.get(request.endpoint)
+        if view is None or request.endpoint == 'static':
+            return None
+
+        key = _client_key()
+        if key:
+            wait = limiter.hit(key, *_worker_share(config['RATE_LIMIT_PER_SECOND'],
+                                                   config['RATE_LIMIT_BURST']))
+        else:
+            wait = limiter.hit(f"ip:{request.remote_addr}",
+                               *_worker_share(config['ANONYMOUS_RATE_LIMIT_PER_SECOND'],
+                                              config['ANONYMOUS_RATE_LIMIT_BURST']))
+        if wait:
+            return _reject(429, 'Слишком много запросов, попробуйте позже', wait)
+
+        if getattr(view, 'admission_exempt', False):
+            return None
+        if not concurrency.try_acquire(getattr(view, 'admission_priority', False)):
+            logging.warning("Сервер перегружен, запрос %s отклонен", request.path)
+            return _reject(503, 'Сервер перегружен, попробуйте позже', config['OVERLOAD_RETRY_AFTER'])
+        g.admission_slot = True
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        if g.pop('admission_slot', False):
+            concurrency.release()
+
+    app.extensions['admission'] = {'rate_limiter': limiter, 'concurrency': concurrency}
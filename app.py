@@ -1,21 +1,32 @@
 # app.py
 
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, flash, session
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt, verify_jwt_in_request
 from config import Config
-from db import get_db_connection
+from repository import get_repository
+from admission import init_admission_control, priority, exempt
+from events import availability
+from recommendations import similar_books
+from audit import audit_log
+from cache import book_cache
 from utils import hash_password, check_password
 import mysql.connector
 from mysql.connector import errorcode
 import logging
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.secret_key = Config.SECRET_KEY
+if Config.PROXY_COUNT:
+    # Без этого за nginx все анонимные клиенты делят один лимит запросов по адресу прокси
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_COUNT, x_proto=Config.PROXY_COUNT,
+                            x_host=Config.PROXY_COUNT)
 
 jwt = JWTManager(app)
+init_admission_control(app)
 
 # Настройка логирования
 logging.basicConfig(level=logging.DEBUG)
@@ -26,6 +37,25 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+def create_user_token(user):
+    # Subject токена должен быть строкой (PyJWT 2.10+), роль и имя - в дополнительных claims
+    return create_access_token(identity=str(user['id']),
+                               additional_claims={'role': user['role'], 'username': user['username']})
+
+
+def get_current_user():
+    """Пользователь из проверенного JWT в том же виде, что и session['user']."""
+    claims = get_jwt()
+    return {'id': int(claims['sub']), 'role': claims['role'], 'username': claims['username']}
+
+
+def quantity_changed(book_id, quantity, user_id):
+    """Сообщает подписчикам и в журнал изменений о новом количестве экземпляров."""
+    book_cache.invalidate(book_id)
+    availability.publish(book_id, quantity)
+    audit_log.record(book_id, 'quantity', user_id, quantity)
+
+
 # Маршрут для регистрации (API)
 @app.route('/api/register', methods=['POST'])
 def register():
@@ -38,20 +68,17 @@ def register():
 
     hashed_pw = hash_password(password)
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
-                       (username, hashed_pw, 'user'))
-        conn.commit()
+        repo.create_user(username, hashed_pw, 'user')
+        repo.commit()
     except mysql.connector.IntegrityError:
-        conn.rollback()
+        repo.rollback()
         return jsonify({'msg': 'Имя пользователя уже существует'}), 409
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return jsonify({'msg': 'Пользователь зарегистрирован успешно'}), 201
 
@@ -63,18 +90,16 @@ def login():
     username = data.get('username')
     password = data.get('password')
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    try:
+        user = repo.get_user_by_username(username)
+    finally:
+        repo.close()
 
     if user and check_password(password, user['password']):
-        access_token = create_access_token(
-            identity={'id': user['id'], 'role': user['role'], 'username': user['username']})
+        access_token = create_user_token(user)
         return jsonify({'access_token': access_token}), 200
     else:
         return jsonify({'msg': 'Неверные учетные данные'}), 401
@@ -90,15 +115,11 @@ def get_books():
     page = request.args.get('page', default=1, type=int)  # Номер страницы
     limit = request.args.get('limit', default=10, type=int)  # Количество записей на странице
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.callproc('search_books_proc', [title, author, genre])
-        books = []
-        for result in cursor.stored_results():
-            books = result.fetchall()
+        books = repo.search_books(title, author, genre)
 
         # Пагинация
         start = (page - 1) * limit
@@ -115,17 +136,15 @@ def get_books():
         print(e)
         return jsonify({'msg': 'Ошибка при поиске книг'}), 500
     finally:
-        cursor.close()
-        conn.close()
-
-    return jsonify(books), 200
+        repo.close()
 
 
 # Маршрут для добавления новой книги (API, только для admin)
 @app.route('/api/books', methods=['POST'])
+@priority
 @jwt_required()
 def add_book():
-    current_user = get_jwt_identity()
+    current_user = get_current_user()
     if current_user['role'] != 'admin':
         return jsonify({'msg': 'Доступ запрещен'}), 403
 
@@ -139,33 +158,82 @@ def add_book():
     if not title or not author:
         return jsonify({'msg': 'Название и автор обязательны'}), 400
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            INSERT INTO books (title, author, genre, publication_year, description)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (title, author, genre, publication_year, description))
-        conn.commit()
-        book_id = cursor.lastrowid
+        book_id = repo.create_book(title, author, genre, publication_year, description)
+        repo.commit()
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         print(e)
         return jsonify({'msg': 'Ошибка при добавлении книги'}), 500
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
+    audit_log.record(book_id, 'create', current_user['id'])
     return jsonify({'msg': 'Книга добавлена', 'book_id': book_id}), 201
 
 
+def load_book(book_id):
+    """Книга из кэша или из базы данных.
+
+    Возвращает (книга, True); книга None, если ее нет. При недоступности базы - (None, False).
+    """
+    book = book_cache.get(book_id)
+    if book is not None:
+        return book, True
+    repo = get_repository()
+    if not repo:
+        return None, False
+    try:
+        book = repo.get_book(book_id)
+    finally:
+        repo.close()
+    if book:
+        book_cache.set(book_id, book)
+    return book, True
+
+
+def load_similar_books(book_id):
+    """Книги "Читатели также бронировали" для страницы книги; без рекомендаций страница работает как прежде."""
+    book_ids = [similar_id for similar_id, _ in similar_books.get(book_id)]
+    if not book_ids:
+        return []
+    repo = get_repository()
+    if not repo:
+        return []
+    try:
+        return repo.list_books_by_ids(book_ids)
+    except Exception:
+        logging.exception("Ошибка при получении рекомендаций.")
+        return []
+    finally:
+        repo.close()
+
+
+# Маршрут для получения одной книги (API)
+@app.route('/api/books/<int:book_id>', methods=['GET'])
+@jwt_required()
+def get_book(book_id):
+    try:
+        book, ok = load_book(book_id)
+    except Exception:
+        logging.exception("Ошибка при получении данных книги.")
+        return jsonify({'msg': 'Ошибка при получении данных книги'}), 500
+    if not ok:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+    if not book:
+        return jsonify({'msg': 'Книга не найдена'}), 404
+    return jsonify(book), 200
+
+
 # Маршрут для редактирования книги (API, только для admin)
 @app.route('/api/books/<int:book_id>', methods=['PUT'])
+@priority
 @jwt_required()
 def edit_book(book_id):
-    current_user = get_jwt_identity()
+    current_user = get_current_user()
     if current_user['role'] != 'admin':
         return jsonify({'msg': 'Доступ запрещен'}), 403
 
@@ -176,54 +244,245 @@ def edit_book(book_id):
     publication_year = data.get('publication_year')
     description = data.get('description')
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("""
-            UPDATE books
-            SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s
-            WHERE id = %s
-        """, (title, author, genre, publication_year, description, book_id))
-        conn.commit()
+        repo.update_book_details(book_id, title, author, genre, publication_year, description)
+        repo.commit()
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         print(e)
         return jsonify({'msg': 'Ошибка при обновлении книги'}), 500
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
+    book_cache.invalidate(book_id)
+    audit_log.record(book_id, 'update', current_user['id'])
     return jsonify({'msg': 'Книга обновлена'}), 200
 
 
 # Маршрут для удаления книги (API, только для admin)
 @app.route('/api/books/<int:book_id>', methods=['DELETE'])
+@priority
 @jwt_required()
 def delete_book(book_id):
-    current_user = get_jwt_identity()
+    current_user = get_current_user()
     if current_user['role'] != 'admin':
         return jsonify({'msg': 'Доступ запрещен'}), 403
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM books WHERE id = %s", (book_id,))
-        conn.commit()
+        repo.delete_book(book_id)
+        repo.commit()
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         print(e)
         return jsonify({'msg': 'Ошибка при удалении книги'}), 500
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
+    book_cache.invalidate(book_id)
+    audit_log.record(book_id, 'delete', current_user['id'])
     return jsonify({'msg': 'Книга удалена'}), 200
 
 
+# Маршрут для получения похожих книг ("Читатели также бронировали", API)
+@app.route('/api/books/<int:book_id>/similar', methods=['GET'])
+@jwt_required()
+def get_similar_books(book_id):
+    limit = request.args.get('limit', default=app.config['RECOMMENDATIONS_TOP_K'], type=int)
+    similar = similar_books.get(book_id)[:max(limit, 0)]
+    return jsonify({
+        'book_id': book_id,
+        'similar': [{'book_id': b, 'score': round(score, 4)} for b, score in similar]
+    }), 200
+
+
+# Маршрут для получения истории изменений книги (API, только для admin)
+@app.route('/api/books/<int:book_id>/history', methods=['GET'])
+@priority
+@jwt_required()
+def get_book_history(book_id):
+    current_user = get_current_user()
+    if current_user['role'] != 'admin':
+        return jsonify({'msg': 'Доступ запрещен'}), 403
+
+    page = max(request.args.get('page', default=1, type=int), 1)
+    limit = min(max(request.args.get('limit', default=50, type=int), 1), 500)
+
+    repo = get_repository()
+    if not repo:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+    try:
+        history = repo.list_book_history(book_id, limit, (page - 1) * limit)
+    except Exception:
+        logging.exception("Ошибка при получении истории изменений книги.")
+        return jsonify({'msg': 'Ошибка при получении истории изменений'}), 500
+    finally:
+        repo.close()
+
+    return jsonify({'book_id': book_id, 'history': history, 'page': page}), 200
+
+
+MAX_BATCH_RESERVATIONS = 50
+
+
+# Маршрут для получения своих бронирований (API)
+@app.route('/api/reservations', methods=['GET'])
+@priority
+@jwt_required()
+def get_reservations():
+    current_user = get_current_user()
+    page = max(request.args.get('page', default=1, type=int), 1)
+    limit = min(max(request.args.get('limit', default=10, type=int), 1), 100)
+
+    repo = get_repository()
+    if not repo:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+    try:
+        total = repo.count_user_reservations(current_user['id'])
+        reservations = repo.list_user_reservations(current_user['id'], limit, (page - 1) * limit)
+    except Exception:
+        logging.exception("Ошибка при получении бронирований.")
+        return jsonify({'msg': 'Ошибка при получении бронирований'}), 500
+    finally:
+        repo.close()
+
+    return jsonify({
+        'reservations': reservations,
+        'total_reservations': total,
+        'page': page,
+        'total_pages': (total + limit - 1) // limit
+    }), 200
+
+
+def _parse_book_ids(values):
+    if not isinstance(values, list) or not values or len(values) > MAX_BATCH_RESERVATIONS:
+        return None
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+def _reserve_api(current_user, book_ids):
+    repo = get_repository()
+    if not repo:
+        return None
+    try:
+        results, available = repo.reserve_books(current_user['id'], book_ids)
+        repo.commit()
+    except Exception:
+        repo.rollback()
+        raise
+    finally:
+        repo.close()
+
+    for book_id in {r['book_id'] for r in results if r['status'] == 'reserved'}:
+        quantity_changed(book_id, available[book_id], current_user['id'])
+    return results
+
+
+# Маршрут для бронирования книги (API)
+@app.route('/api/reservations', methods=['POST'])
+@priority
+@jwt_required()
+def create_reservation():
+    current_user = get_current_user()
+    data = request.get_json(silent=True) or {}
+    book_ids = _parse_book_ids([data.get('book_id')])
+    if not book_ids:
+        return jsonify({'msg': 'Не указан идентификатор книги'}), 400
+
+    try:
+        results = _reserve_api(current_user, book_ids)
+    except Exception:
+        logging.exception("Ошибка при бронировании книги.")
+        return jsonify({'msg': 'Ошибка при бронировании книги'}), 500
+    if results is None:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+
+    result = results[0]
+    if result['status'] == 'not_found':
+        return jsonify({'msg': 'Книга не найдена'}), 404
+    if result['status'] == 'unavailable':
+        return jsonify({'msg': 'Нет доступных экземпляров этой книги'}), 409
+    return jsonify({'msg': 'Книга забронирована', 'reservation_id': result['reservation_id']}), 201
+
+
+# Маршрут для бронирования нескольких книг одной транзакцией (API)
+@app.route('/api/reservations/batch', methods=['POST'])
+@priority
+@jwt_required()
+def create_reservations_batch():
+    current_user = get_current_user()
+    data = request.get_json(silent=True) or {}
+    book_ids = _parse_book_ids(data.get('book_ids'))
+    if not book_ids:
+        return jsonify({'msg': f'Передайте от 1 до {MAX_BATCH_RESERVATIONS} идентификаторов книг'}), 400
+
+    try:
+        results = _reserve_api(current_user, book_ids)
+    except Exception:
+        logging.exception("Ошибка при пакетном бронировании книг.")
+        return jsonify({'msg': 'Ошибка при бронировании книг'}), 500
+    if results is None:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+
+    reserved = sum(1 for r in results if r['status'] == 'reserved')
+    return jsonify({'results': results, 'reserved': reserved}), 200
+
+
+# Маршрут для отмены своего бронирования (API)
+@app.route('/api/reservations/<int:reservation_id>', methods=['DELETE'])
+@priority
+@jwt_required()
+def cancel_reservation_api(reservation_id):
+    current_user = get_current_user()
+
+    repo = get_repository()
+    if not repo:
+        return jsonify({'msg': 'Ошибка подключения к базе данных'}), 500
+    try:
+        status, book_id, quantity = repo.cancel_reservation(reservation_id, current_user['id'])
+        repo.commit()
+    except Exception:
+        repo.rollback()
+        logging.exception("Ошибка при отмене бронирования.")
+        return jsonify({'msg': 'Ошибка при отмене бронирования'}), 500
+    finally:
+        repo.close()
+
+    if status == 'not_found':
+        return jsonify({'msg': 'Бронирование не найдено'}), 404
+    if status == 'inactive':
+        return jsonify({'msg': 'Только активные бронирования могут быть отменены'}), 409
+    quantity_changed(book_id, quantity, current_user['id'])
+    return jsonify({'msg': 'Бронирование отменено'}), 200
+
+
+# Поток изменений доступности книг (Server-Sent Events)
+@app.route('/api/availability/stream')
+@exempt
+def availability_stream():
+    if not session.get('user'):
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return jsonify({'msg': 'Требуется авторизация'}), 401
+
+    subscriber = availability.subscribe()
+    if subscriber is None:
+        return jsonify({'msg': 'Слишком много подписчиков, попробуйте позже'}), 503, {'Retry-After': '30'}
+
+    response = Response(availability.stream(subscriber), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: availability.unsubscribe(subscriber))
+    return response
+
+
 # Маршрут для регистрации (HTML форма)
 @app.route('/register', methods=['GET', 'POST'])
 def register_page():
@@ -237,24 +496,21 @@ def register_page():
 
         hashed_pw = hash_password(password)
 
-        conn = get_db_connection()
-        if not conn:
+        repo = get_repository()
+        if not repo:
             flash('Ошибка подключения к базе данных')
             return redirect(url_for('register_page'))
-        cursor = conn.cursor()
         try:
-            cursor.execute("INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
-                           (username, hashed_pw, 'user'))
-            conn.commit()
+            repo.create_user(username, hashed_pw, 'user')
+            repo.commit()
             flash('Пользователь успешно зарегистрирован')
             return redirect(url_for('login_page'))
         except mysql.connector.IntegrityError:
-            conn.rollback()
+            repo.rollback()
             flash('Имя пользователя уже существует')
             return redirect(url_for('register_page'))
         finally:
-            cursor.close()
-            conn.close()
+            repo.close()
     return render_template('register.html')
 
 
@@ -265,19 +521,17 @@ def login_page():
         username = request.form.get('username')
         password = request.form.get('password')
 
-        conn = get_db_connection()
-        if not conn:
+        repo = get_repository()
+        if not repo:
             flash('Ошибка подключения к базе данных')
             return redirect(url_for('login_page'))
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        try:
+            user = repo.get_user_by_username(username)
+        finally:
+            repo.close()
 
         if user and check_password(password, user['password']):
-            access_token = create_access_token(
-                identity={'id': user['id'], 'role': user['role'], 'username': user['username']})
+            access_token = create_user_token(user)
             session['access_token'] = access_token
             session['user'] = {'id': user['id'], 'role': user['role'], 'username': user['username']}
             flash('Вы успешно вошли в систему')
@@ -307,29 +561,22 @@ def index():
     title = request.args.get('title')
     author = request.args.get('author')
     genre = request.args.get('genre')
-    page = request.args.get('page', default=1, type=int)
-    limit = request.args.get('limit', default=10, type=int)
+    page = max(request.args.get('page', default=1, type=int), 1)
+    limit = min(max(request.args.get('limit', default=10, type=int), 1), 100)
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return render_template('index.html', books=[], current_user=user, page=page, total_pages=1)
-    cursor = conn.cursor(dictionary=True)
     try:
-        cursor.callproc('search_books_proc', [title, author, genre])
-        books = []
-        for result in cursor.stored_results():
-            books = result.fetchall()
-
-        # Пагинация
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_books = books[start:end]
-        total_pages = (len(books) + limit - 1) // limit
+        # Пагинация на стороне базы; описания книг - только начало
+        total_pages = (repo.count_books(title, author, genre) + limit - 1) // limit
+        books = repo.list_book_previews(title, author, genre, app.config['DESCRIPTION_PREVIEW_LENGTH'],
+                                        limit, (page - 1) * limit)
 
         return render_template(
             'index.html',
-            books=paginated_books,
+            books=books,
             current_user=user,
             page=page,
             total_pages=total_pages,
@@ -339,13 +586,36 @@ def index():
         flash('Ошибка при поиске книг')
         return render_template('index.html', books=[], current_user=user, page=page, total_pages=1)
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
         logging.debug("Database connection closed.")
 
 
+# Страница книги
+@app.route('/book/<int:book_id>')
+def book_page(book_id):
+    user = session.get('user')
+    if not user:
+        return redirect(url_for('login_page'))
+
+    try:
+        book, ok = load_book(book_id)
+    except Exception:
+        logging.exception("Ошибка при получении данных книги.")
+        flash('Ошибка при получении данных книги')
+        return redirect(url_for('index'))
+    if not ok:
+        flash('Ошибка подключения к базе данных')
+        return redirect(url_for('index'))
+    if not book:
+        flash('Книга не найдена')
+        return redirect(url_for('index'))
+
+    return render_template('book.html', book=book, similar=load_similar_books(book_id), current_user=user)
+
+
 # Маршрут для добавления книги (HTML форма)
 @app.route('/add_book', methods=['GET', 'POST'])
+@priority
 def add_book_page():
     user = session.get('user')
     if not user or user['role'] != 'admin':
@@ -370,44 +640,41 @@ def add_book_page():
             flash('Недопустимый формат файла для обложки.')
             return redirect(url_for('add_book_page'))
 
-        conn = get_db_connection()
-        if not conn:
+        repo = get_repository()
+        if not repo:
             flash('Ошибка подключения к базе данных')
             return redirect(url_for('add_book_page'))
-        cursor = conn.cursor()
         try:
-            cursor.execute("""
-                INSERT INTO books (title, author, genre, publication_year, description, quantity, cover_image)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (title, author, genre, publication_year, description, quantity, cover_image_filename))
-            conn.commit()
+            book_id = repo.create_book(title, author, genre, publication_year, description, quantity,
+                                       cover_image_filename)
+            repo.commit()
+            audit_log.record(book_id, 'create', user['id'], int(quantity) if str(quantity).isdigit() else None)
             flash('Книга успешно добавлена')
             return redirect(url_for('index'))
         except Exception as e:
-            conn.rollback()
+            repo.rollback()
             logging.exception("Ошибка при добавлении книги.")
             flash('Ошибка при добавлении книги')
             return redirect(url_for('add_book_page'))
         finally:
-            cursor.close()
-            conn.close()
+            repo.close()
 
     return render_template('add_book.html')
 
 
 # Маршрут для редактирования книги (HTML форма)
 @app.route('/edit_book/<int:book_id>', methods=['GET', 'POST'])
+@priority
 def edit_book_page(book_id):
     user = session.get('user')
     if not user or user['role'] != 'admin':
         flash('У вас нет прав для доступа к этой странице')
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('index'))
-    cursor = conn.cursor(dictionary=True)
 
     if request.method == 'POST':
         title = request.form.get('title')
@@ -424,38 +691,33 @@ def edit_book_page(book_id):
             cover_image_filename = secure_filename(cover_image.filename)
             cover_image.save(os.path.join(app.config['UPLOAD_FOLDER'], cover_image_filename))
         elif cover_image:
+            repo.close()
             flash('Недопустимый формат файла для обложки.')
             return redirect(url_for('edit_book_page', book_id=book_id))
 
         try:
-            if cover_image_filename:
-                cursor.execute("""
-                    UPDATE books
-                    SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s, quantity = %s, cover_image = %s
-                    WHERE id = %s
-                """, (title, author, genre, publication_year, description, quantity, cover_image_filename, book_id))
+            repo.update_book(book_id, title, author, genre, publication_year, description, quantity,
+                             cover_image_filename)
+            repo.commit()
+            book_cache.invalidate(book_id)
+            if str(quantity).isdigit():
+                availability.publish(book_id, int(quantity))
+                audit_log.record(book_id, 'update', user['id'], int(quantity))
             else:
-                cursor.execute("""
-                    UPDATE books
-                    SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s, quantity = %s
-                    WHERE id = %s
-                """, (title, author, genre, publication_year, description, quantity, book_id))
-            conn.commit()
+                audit_log.record(book_id, 'update', user['id'])
             flash('Книга успешно обновлена')
             return redirect(url_for('index'))
         except Exception as e:
-            conn.rollback()
+            repo.rollback()
             logging.exception("Ошибка при обновлении книги.")
             flash('Ошибка при обновлении книги')
             return redirect(url_for('edit_book_page', book_id=book_id))
         finally:
-            cursor.close()
-            conn.close()
+            repo.close()
 
     # Получение данных книги для предзаполнения формы
     try:
-        cursor.execute("SELECT * FROM books WHERE id = %s", (book_id,))
-        book = cursor.fetchone()
+        book = repo.get_book(book_id)
         if not book:
             flash('Книга не найдена')
             return redirect(url_for('index'))
@@ -464,261 +726,191 @@ def edit_book_page(book_id):
         flash('Ошибка при получении данных книги')
         return redirect(url_for('index'))
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return render_template('edit_book.html', book=book)
 
 
 # Маршрут для удаления книги (HTML форма)
 @app.route('/delete_book/<int:book_id>', methods=['POST'])
+@priority
 def delete_book_page(book_id):
     user = session.get('user')
     if not user or user['role'] != 'admin':
         flash('У вас нет прав для выполнения этого действия')
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('index'))
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM books WHERE id = %s", (book_id,))
-        conn.commit()
+        repo.delete_book(book_id)
+        repo.commit()
+        book_cache.invalidate(book_id)
+        audit_log.record(book_id, 'delete', user['id'])
         flash('Книга успешно удалена')
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         logging.exception("Error during deleting book.")
         flash('Ошибка при удалении книги')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return redirect(url_for('index'))
 
 
 # Маршрут для бронирования книги (HTML форма)
 @app.route('/reserve_book/<int:book_id>', methods=['POST'])
+@priority
 def reserve_book(book_id):
     user = session.get('user')
     if not user:
         flash('Пожалуйста, войдите в систему, чтобы бронировать книги.')
         return redirect(url_for('login_page'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('index'))
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        # Проверка доступности книги
-        cursor.execute("SELECT quantity FROM books WHERE id = %s", (book_id,))
-        book = cursor.fetchone()
-        if not book:
+        result = repo.reserve_book(user['id'], book_id)
+        if result['status'] == 'not_found':
             flash('Книга не найдена.')
-            return redirect(url_for('index'))
-        if book['quantity'] < 1:
+        elif result['status'] == 'unavailable':
             flash('Нет доступных экземпляров этой книги для бронирования.')
-            return redirect(url_for('index'))
-
-        # Уменьшение количества доступных экземпляров
-        cursor.execute("UPDATE books SET quantity = quantity - 1 WHERE id = %s", (book_id,))
-
-        # Добавление записи в таблицу reservations
-        cursor.execute("""
-            INSERT INTO reservations (user_id, book_id)
-            VALUES (%s, %s)
-        """, (user['id'], book_id))
-
-        conn.commit()
-        flash('Книга успешно забронирована.')
+        else:
+            repo.commit()
+            quantity_changed(book_id, result['quantity'], user['id'])
+            flash('Книга успешно забронирована.')
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         logging.exception("Ошибка при бронировании книги.")
         flash('Ошибка при бронировании книги.')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return redirect(url_for('index'))
 
 
 # Маршрут для просмотра своих бронирований
 @app.route('/my_reservations')
+@priority
 def my_reservations():
     user = session.get('user')
     if not user:
         flash('Пожалуйста, войдите в систему, чтобы просматривать бронирования.')
         return redirect(url_for('login_page'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('index'))
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("""
-            SELECT r.id, b.title, b.author, r.reservation_date, r.status
-            FROM reservations r
-            JOIN books b ON r.book_id = b.id
-            WHERE r.user_id = %s
-            ORDER BY r.reservation_date DESC
-        """, (user['id'],))
-        reservations = cursor.fetchall()
+        reservations = repo.list_user_reservations(user['id'])
     except Exception as e:
         logging.exception("Ошибка при получении бронирований.")
         reservations = []
         flash('Ошибка при получении бронирований.')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return render_template('my_reservations.html', reservations=reservations, current_user=user)
 
 
 # Маршрут для отмены бронирования пользователем
 @app.route('/cancel_reservation/<int:reservation_id>', methods=['POST'])
+@priority
 def cancel_reservation(reservation_id):
     user = session.get('user')
     if not user:
         flash('Пожалуйста, войдите в систему, чтобы отменить бронирование.')
         return redirect(url_for('login_page'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('my_reservations'))
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        # Проверка, принадлежит ли бронирование текущему пользователю и активно ли оно
-        cursor.execute("""
-            SELECT book_id, status FROM reservations
-            WHERE id = %s AND user_id = %s
-        """, (reservation_id, user['id']))
-        reservation = cursor.fetchone()
-        if not reservation:
+        # Бронирование должно принадлежать текущему пользователю и быть активным
+        status, book_id, quantity = repo.cancel_reservation(reservation_id, user['id'])
+        if status == 'not_found':
             flash('Бронирование не найдено или вы не имеете к нему доступа.')
-            return redirect(url_for('my_reservations'))
-        if reservation['status'] != 'active':
+        elif status == 'inactive':
             flash('Только активные бронирования могут быть отменены.')
-            return redirect(url_for('my_reservations'))
-
-        # Обновление статуса бронирования на отменено
-        cursor.execute("""
-            UPDATE reservations
-            SET status = 'canceled'
-            WHERE id = %s
-        """, (reservation_id,))
-
-        # Увеличение количества доступных экземпляров книги
-        cursor.execute("""
-            UPDATE books
-            SET quantity = quantity + 1
-            WHERE id = %s
-        """, (reservation['book_id'],))
-
-        conn.commit()
-        flash('Бронирование успешно отменено.')
+        else:
+            repo.commit()
+            quantity_changed(book_id, quantity, user['id'])
+            flash('Бронирование успешно отменено.')
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         logging.exception("Ошибка при отмене бронирования.")
         flash('Ошибка при отмене бронирования.')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return redirect(url_for('my_reservations'))
 
 
 # Новый маршрут для администраторов: просмотр всех бронирований
 @app.route('/admin_reservations')
+@priority
 def admin_reservations():
     user = session.get('user')
     if not user or user['role'] != 'admin':
         flash('У вас нет прав для доступа к этой странице.')
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('index'))
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        cursor.execute("""
-            SELECT r.id, u.username, b.title, b.author, r.reservation_date, r.status
-            FROM reservations r
-            JOIN users u ON r.user_id = u.id
-            JOIN books b ON r.book_id = b.id
-            ORDER BY r.reservation_date DESC
-        """)
-        reservations = cursor.fetchall()
+        reservations = repo.list_all_reservations()
     except Exception as e:
         logging.exception("Ошибка при получении всех бронирований.")
         reservations = []
         flash('Ошибка при получении бронирований.')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return render_template('admin_reservations.html', reservations=reservations, current_user=user)
 
 
 # Новый маршрут для администраторов: отмена любого бронирования
 @app.route('/admin_cancel_reservation/<int:reservation_id>', methods=['POST'])
+@priority
 def admin_cancel_reservation(reservation_id):
     user = session.get('user')
     if not user or user['role'] != 'admin':
         flash('У вас нет прав для выполнения этого действия.')
         return redirect(url_for('index'))
 
-    conn = get_db_connection()
-    if not conn:
+    repo = get_repository()
+    if not repo:
         flash('Ошибка подключения к базе данных')
         return redirect(url_for('admin_reservations'))
-    cursor = conn.cursor(dictionary=True)
 
     try:
-        # Проверка существования бронирования
-        cursor.execute("""
-            SELECT book_id, status FROM reservations
-            WHERE id = %s
-        """, (reservation_id,))
-        reservation = cursor.fetchone()
-        if not reservation:
+        status, book_id, quantity = repo.cancel_reservation(reservation_id)
+        if status == 'not_found':
             flash('Бронирование не найдено.')
-            return redirect(url_for('admin_reservations'))
-        if reservation['status'] != 'active':
+        elif status == 'inactive':
             flash('Только активные бронирования могут быть отменены.')
-            return redirect(url_for('admin_reservations'))
-
-        # Обновление статуса бронирования на отменено
-        cursor.execute("""
-            UPDATE reservations
-            SET status = 'canceled'
-            WHERE id = %s
-        """, (reservation_id,))
-
-        # Увеличение количества доступных экземпляров книги
-        cursor.execute("""
-            UPDATE books
-            SET quantity = quantity + 1
-            WHERE id = %s
-        """, (reservation['book_id'],))
-
-        conn.commit()
-        flash('Бронирование успешно отменено.')
+        else:
+            repo.commit()
+            quantity_changed(book_id, quantity, user['id'])
+            flash('Бронирование успешно отменено.')
     except Exception as e:
-        conn.rollback()
+        repo.rollback()
         logging.exception("Ошибка при отмене бронирования администратором.")
         flash('Ошибка при отмене бронирования.')
     finally:
-        cursor.close()
-        conn.close()
+        repo.close()
 
     return redirect(url_for('admin_reservations'))
 
@@ -0,0 +1,181 @@
+# audit.py
+#
+# Журнал изменений книг. Записи копятся в памяти и пишутся в book_audit_log
+# пачками из фонового потока, вне транзакций запросов, через отдельное
+# соединение, не занимающее соединения пула.
+# Обслуживание секций таблицы (например, раз в сутки из cron):
+#     python audit.py
+
+from config import Config
+from db import connect, get_db_connection
+from datetime import date, datetime
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+INSERT_EVENTS = """
+    INSERT INTO book_audit_log (book_id, action, user_id, quantity, created_at)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+class AuditLog:
+    """Асинхронная пакетная запись событий: create, update, delete, quantity."""
+
+    def __init__(self, batch_size=200, flush_interval=1.0, max_queue=10000, max_retry_delay=30.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retry_delay = max_retry_delay
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        # Потоки не переживают fork, поэтому каждый процесс запускает свой
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            # Соединение родительского процесса после fork не используется
+            self._conn = None
+            threading.Thread(target=self._run, name='audit-writer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def record(self, book_id, action, user_id=None, quantity=None):
+        """Ставит событие в очередь; никогда не блокирует запрос."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((book_id, action, user_id, quantity, datetime.now()))
+        except queue.Full:
+            logging.warning("Очередь журнала изменений переполнена, событие %s книги %s потеряно",
+                            action, book_id)
+
+    def _run(self):
+        events = self._queue
+        while True:
+            batch = [events.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(events.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            # Пачка повторяется, пока база не станет доступна; новые события
+            # тем временем копятся в очереди (не больше max_queue)
+            delay = self.flush_interval
+            while not self._write(batch):
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def _write(self, batch):
+        """Записывает пачку одной транзакцией; возвращает False, если ее нужно повторить."""
+        with self._conn_lock:
+            try:
+                if self._conn is None or not self._conn.is_connected():
+                    self._conn = connect()
+                cursor = self._conn.cursor()
+                try:
+                    cursor.executemany(INSERT_EVENTS, batch)
+                    self._conn.commit()
+                finally:
+                    cursor.close()
+                return True
+            except Exception:
+                logging.exception("Ошибка при записи журнала изменений (%s событий), запись будет повторена.",
+                                  len(batch))
+                self._reset_connection()
+                return False
+
+    def _reset_connection(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def flush(self):
+        """Синхронно записывает все, что осталось в очереди (при завершении процесса)."""
+        if self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(batch), self.batch_size):
+            # При завершении процесса ждать базу некогда: одна повторная попытка
+            chunk = batch[start:start + self.batch_size]
+            if not self._write(chunk) and not self._write(chunk):
+                logging.error("Журнал изменений: потеряно %s событий", len(batch) - start)
+                return
+
+
+def _month_start(day, months=0):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def rotate_partitions(keep_months=None, months_ahead=2):
+    """Создает секции book_audit_log на ближайшие месяцы и удаляет старше keep_months.
+
+    Таблица секционирована по месяцам (RANGE по TO_DAYS(created_at)) и имеет
+    секцию pmax для всего остального; новые секции отделяются от pmax.
+    """
+    keep_months = keep_months or Config.AUDIT_KEEP_MONTHS
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Ошибка подключения к базе данных")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'book_audit_log'
+        """)
+        existing = {row[0] for row in cursor.fetchall()}
+
+        today = date.today()
+        for i in range(months_ahead + 1):
+            month = _month_start(today, i)
+            name = _partition_name(month)
+            if name in existing:
+                continue
+            cursor.execute(f"""
+                ALTER TABLE book_audit_log REORGANIZE PARTITION pmax INTO (
+                    PARTITION {name} VALUES LESS THAN (TO_DAYS('{_month_start(month, 1)}')),
+                    PARTITION pmax VALUES LESS THAN MAXVALUE
+                )
+            """)
+            existing.add(name)
+
+        oldest = _partition_name(_month_start(today, -keep_months))
+        expired = sorted(name for name in existing if name != 'pmax' and name < oldest)
+        if expired:
+            cursor.execute(f"ALTER TABLE book_audit_log DROP PARTITION {', '.join(expired)}")
+        return expired
+    finally:
+        cursor.close()
+        conn.close()
+
+
+audit_log = AuditLog(Config.AUDIT_BATCH_SIZE, Config.AUDIT_FLUSH_INTERVAL, Config.AUDIT_QUEUE_SIZE,
+                     Config.AUDIT_RETRY_MAX_DELAY)
+atexit.register(audit_log.flush)
+
+
+if __name__ == "__main__":
+    dropped = rotate_partitions()
+    print(f"Секции журнала изменений обновлены, удалено: {', '.join(dropped) or 'нет'}.")
@@ -0,0 +1,102 @@
+# bench_statements.py
+#
+# Сравнение обычных запросов с подготовленными (курсор prepared=True, запрос
+# подготавливается один раз и выполняется повторно) для обеих реализаций
+# драйвера: C-расширения и чистого Python (MYSQL_USE_PURE, используется под gevent).
+# Работает с любой базой MySQL из настроек (MYSQL_HOST, MYSQL_DATABASE, ...):
+#     python bench_statements.py [--iterations 5000]
+# Запрос книги по id измеряется, только если в базе есть таблица books.
+
+from db import connect
+import argparse
+import time
+
+QUERIES = {
+    # Запрос, не зависящий от схемы базы
+    'select': ("SELECT %s + 1 AS value, %s AS label", (41, 'книга')),
+    'book_by_id': ("SELECT id, title, author, genre, publication_year, description, quantity, cover_image "
+                   "FROM books WHERE id = %s", (1,)),
+}
+
+# Команды протокола, каждая - отдельное обращение к серверу
+COMMANDS = ('cmd_query', 'cmd_stmt_prepare', 'cmd_stmt_reset', 'cmd_stmt_execute', 'cmd_stmt_fetch')
+
+
+def count_commands(conn):
+    """Подменяет методы соединения счетчиками; возвращает словарь {команда: число вызовов}."""
+    counts = dict.fromkeys(COMMANDS, 0)
+
+    def counted(name, method):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    for name in COMMANDS:
+        # У соединения C-расширения нет cmd_stmt_fetch
+        if hasattr(conn, name):
+            setattr(conn, name, counted(name, getattr(conn, name)))
+    return counts
+
+
+def plain(conn, operation, params):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(operation, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def prepared(cursor, operation, params):
+    # Тот же объект строки: драйвер не подготавливает запрос заново
+    cursor.execute(operation, params)
+    return cursor.fetchall()
+
+
+def measure(func, target, operation, params, iterations, counts):
+    func(target, operation, params)  # прогрев: подготовка запроса на сервере
+    before = sum(counts.values())
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(target, operation, params)
+    elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1e6, (sum(counts.values()) - before) / iterations
+
+
+def has_books_table(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW TABLES LIKE 'books'")
+        return bool(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Подготовленные запросы против обычных")
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'драйвер':<8}{'запрос':<12}{'обычный, мкс':>14}{'команд':>8}"
+          f"{'подготовленный, мкс':>22}{'команд':>8}")
+    for use_pure in (False, True):
+        conn = connect(use_pure=use_pure)
+        try:
+            counts = count_commands(conn)
+            names = ['select'] + (['book_by_id'] if has_books_table(conn) else [])
+            cursor = conn.cursor(prepared=True, dictionary=True)
+            for name in names:
+                operation, params = QUERIES[name]
+                plain_time, plain_commands = measure(plain, conn, operation, params, args.iterations, counts)
+                prepared_time, prepared_commands = measure(prepared, cursor, operation, params,
+                                                           args.iterations, counts)
+                print(f"{'pure' if use_pure else 'C':<8}{name:<12}{plain_time:>14.1f}{plain_commands:>8.0f}"
+                      f"{prepared_time:>22.1f}{prepared_commands:>8.0f}")
+            cursor.close()
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
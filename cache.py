@@ -0,0 +1,46 @@
+# cache.py
+
+from collections import OrderedDict
+from config import Config
+import threading
+import time
+
+
+class TTLCache:
+    """LRU-кэш с временем жизни записей, общий для потоков одного процесса.
+
+    Другие процессы-воркеры не узнают об инвалидации, поэтому ttl ограничивает,
+    насколько устаревшими могут быть их данные.
+    """
+
+    def __init__(self, ttl, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+book_cache = TTLCache(Config.BOOK_CACHE_TTL, Config.BOOK_CACHE_SIZE)
@@ -9,6 +9,63 @@ class Config:
     MYSQL_USER = os.environ.get('MYSQL_USER') or 'root'
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or '0604Diksd'
     MYSQL_PORT = int(os.environ.get('MYSQL_PORT', 3306))
+    MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', 10))
+
+    # Контроль нагрузки: одновременно обрабатывается не больше запросов,
+    # чем соединений в пуле; часть мест оставлена приоритетным маршрутам
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', MYSQL_POOL_SIZE))
+    PRIORITY_RESERVED_SLOTS = int(os.environ.get('PRIORITY_RESERVED_SLOTS', 2))
+    # Лимиты запросов (маркеров в секунду / размер корзины)
+    RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 5))
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 20))
+    ANONYMOUS_RATE_LIMIT_PER_SECOND = float(os.environ.get('ANONYMOUS_RATE_LIMIT_PER_SECOND', 1))
+    ANONYMOUS_RATE_LIMIT_BURST = int(os.environ.get('ANONYMOUS_RATE_LIMIT_BURST', 10))
+    OVERLOAD_RETRY_AFTER = int(os.environ.get('OVERLOAD_RETRY_AFTER', 1))
+    # Корзины лимитов хранятся в памяти процесса, поэтому лимиты делятся между
+    # процессами-воркерами (wsgi.py задает число своих воркеров)
+    RATE_LIMIT_WORKERS = int(os.environ.get('RATE_LIMIT_WORKERS', 1))
+    # Число обратных прокси (nginx) перед приложением: адрес клиента для лимитов
+    # берется из X-Forwarded-For. 0 - приложение доступно напрямую
+    PROXY_COUNT = int(os.environ.get('PROXY_COUNT', 0))
+
+    # Поток изменений доступности книг (SSE)
+    SSE_BUFFER_SIZE = int(os.environ.get('SSE_BUFFER_SIZE', 100))
+    SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 200))
+
+    # Настройки сервера для запуска через wsgi.py
+    SERVER_BIND = os.environ.get('SERVER_BIND') or '0.0.0.0:8000'
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    # gevent обслуживает открытые SSE-потоки, не занимая потоков воркера;
+    # gthread - обычные потоки, каждый SSE-подписчик держит один из них
+    SERVER_WORKER_CLASS = os.environ.get('SERVER_WORKER_CLASS') or 'gevent'
+    SERVER_WORKER_CONNECTIONS = int(os.environ.get('SERVER_WORKER_CONNECTIONS', 1000))
+    # Для gthread: потоков не меньше, чем одновременно обрабатываемых запросов
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', MAX_CONCURRENT_REQUESTS))
+    # C-расширение mysql-connector блокирует цикл событий gevent, поэтому под gevent
+    # используется реализация на чистом Python
+    MYSQL_USE_PURE = os.environ.get('MYSQL_USE_PURE', str(SERVER_WORKER_CLASS == 'gevent')).lower() in ('1', 'true')
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 1000))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 100))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 30))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+
+    # Рекомендации "Читатели также бронировали" (пересчитываются python recommendations.py)
+    RECOMMENDATIONS_PATH = os.environ.get('RECOMMENDATIONS_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data', 'similar_books.npz')
+    RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', 10))
+    RECOMMENDATIONS_CHECK_INTERVAL = int(os.environ.get('RECOMMENDATIONS_CHECK_INTERVAL', 60))
+
+    # Журнал изменений книг (audit.py)
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    AUDIT_RETRY_MAX_DELAY = float(os.environ.get('AUDIT_RETRY_MAX_DELAY', 30.0))
+    AUDIT_KEEP_MONTHS = int(os.environ.get('AUDIT_KEEP_MONTHS', 12))
+
+    # Каталог: длина описания в списке книг и кэш страниц отдельных книг
+    DESCRIPTION_PREVIEW_LENGTH = int(os.environ.get('DESCRIPTION_PREVIEW_LENGTH', 150))
+    BOOK_CACHE_TTL = int(os.environ.get('BOOK_CACHE_TTL', 30))
+    BOOK_CACHE_SIZE = int(os.environ.get('BOOK_CACHE_SIZE', 1024))
 
     # Настройки загрузки файлов
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static', 'uploads')
@@ -1,19 +1,52 @@
 # db.py
 
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from config import Config
 import logging
+import threading
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _create_pool():
+    # Вызывается под _pool_lock
+    global _pool
+    _pool = None
+    _pool = pooling.MySQLConnectionPool(
+        pool_name='library_pool',
+        pool_size=Config.MYSQL_POOL_SIZE,
+        host=Config.MYSQL_HOST,
+        database=Config.MYSQL_DATABASE,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        port=Config.MYSQL_PORT,
+        use_pure=Config.MYSQL_USE_PURE
+    )
+    return _pool
+
+
+def init_db_pool():
+    """Создает пул соединений с базой данных для текущего процесса (заменяя прежний)."""
+    with _pool_lock:
+        return _create_pool()
+
+
+def _get_pool():
+    # Повторная проверка под блокировкой: при одновременных первых запросах
+    # пул создается один раз, и соединений не становится больше MYSQL_POOL_SIZE
+    pool = _pool
+    if pool is None:
+        with _pool_lock:
+            pool = _pool if _pool is not None else _create_pool()
+    return pool
+
 
 def get_db_connection():
+    # conn.close() у соединения из пула возвращает его обратно в пул
     try:
-        connection = mysql.connector.connect(
-            host=Config.MYSQL_HOST,
-            database=Config.MYSQL_DATABASE,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            port=Config.MYSQL_PORT
-        )
+        connection = _get_pool().get_connection()
         if connection.is_connected():
             return connection
     except Error as e:
@@ -21,6 +54,18 @@ def get_db_connection():
         return None
 
 
+def connect(use_pure=None):
+    """Отдельное соединение вне пула для фоновых задач; не занимает соединения запросов."""
+    return mysql.connector.connect(
+        host=Config.MYSQL_HOST,
+        database=Config.MYSQL_DATABASE,
+        user=Config.MYSQL_USER,
+        password=Config.MYSQL_PASSWORD,
+        port=Config.MYSQL_PORT,
+        use_pure=Config.MYSQL_USE_PURE if use_pure is None else use_pure
+    )
+
+
 def create_function_and_procedures():
     conn = get_db_connection()
     if not conn:
@@ -55,20 +100,45 @@ def create_function_and_procedures():
         """)
         print("Процедура add_new_book создана.")
 
-        # Создание триггера
+    except Exception as e:
+        print(f"Ошибка при создании функции/процедуры: {e}")
+
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def create_audit_log():
+    """Создает таблицу журнала изменений независимо от функций и процедур."""
+    conn = get_db_connection()
+    if not conn:
+        print("Ошибка подключения к базе данных")
+        return
+    cursor = conn.cursor()
+
+    try:
+        # Журнал изменений пишет приложение пачками (audit.py), а не триггер
+        # внутри каждого UPDATE books
+        cursor.execute("DROP TRIGGER IF EXISTS after_book_update")
         cursor.execute("""
-            CREATE TRIGGER after_book_update
-            AFTER UPDATE ON books
-            FOR EACH ROW
-            BEGIN
-                INSERT INTO book_logs (book_id, action, changed_at)
-                VALUES (OLD.id, 'UPDATE', NOW());
-            END;
+            CREATE TABLE IF NOT EXISTS book_audit_log (
+                id BIGINT NOT NULL AUTO_INCREMENT,
+                book_id INT NOT NULL,
+                action VARCHAR(16) NOT NULL,
+                user_id INT NULL,
+                quantity INT NULL,
+                created_at DATETIME(6) NOT NULL,
+                PRIMARY KEY (id, created_at),
+                KEY idx_book_audit_book (book_id, created_at)
+            )
+            PARTITION BY RANGE (TO_DAYS(created_at)) (
+                PARTITION pmax VALUES LESS THAN MAXVALUE
+            )
         """)
-        print("Триггер after_book_update создан.")
+        print("Таблица book_audit_log создана. Секции по месяцам создает python audit.py.")
 
     except Exception as e:
-        print(f"Ошибка при создании функции/процедуры/триггера: {e}")
+        print(f"Ошибка при создании журнала изменений: {e}")
 
     finally:
         cursor.close()
@@ -76,4 +146,5 @@ def create_function_and_procedures():
 
 # Вызов функции для создания структуры базы данных
 if __name__ == "__main__":
-    create_function_and_procedures()
\ No newline at end of file
+    create_function_and_procedures()
+    create_audit_log()
\ No newline at end of file
@@ -0,0 +1,67 @@
+# events.py
+
+from config import Config
+import json
+import queue
+import threading
+
+
+class AvailabilityBroadcaster:
+    """Рассылка изменений количества экземпляров книг подписчикам SSE.
+
+    Работает внутри одного процесса: при нескольких воркерах Gunicorn подписчик
+    получает события только от запросов своего воркера. У каждого подписчика своя ограниченная
+    очередь: если клиент не успевает читать, самые старые события отбрасываются,
+    и публикация никогда не блокирует обработку запроса.
+    """
+
+    def __init__(self, buffer_size=100, max_subscribers=200):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Возвращает очередь нового подписчика или None, если мест нет."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = queue.Queue(maxsize=self.buffer_size)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, book_id, quantity):
+        event = {'book_id': book_id, 'quantity': quantity}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def stream(self, subscriber, keepalive=15):
+        """Генератор сообщений SSE для подписчика; отписывает его при закрытии соединения."""
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+availability = AvailabilityBroadcaster(Config.SSE_BUFFER_SIZE, Config.SSE_MAX_SUBSCRIBERS)
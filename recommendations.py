@@ -0,0 +1,131 @@
+# recommendations.py
+#
+# Рекомендации "Читатели также бронировали" по совместным бронированиям.
+# Пересчет (например, раз в час из cron):
+#     python recommendations.py
+
+from config import Config
+from repository import get_repository
+import numpy as np
+import logging
+import os
+import threading
+import time
+
+
+def build_similar_books(user_ids, book_ids, top_k):
+    """Строит top_k похожих книг для каждой книги по парам (пользователь, книга).
+
+    Похожесть - косинусная мера столбцов бинарной матрицы пользователь x книга.
+    Возвращает массивы в формате CSR: books, indptr, neighbours, scores.
+    """
+    # scipy нужен только пересчету; воркерам, читающим готовый файл, хватает numpy
+    from scipy import sparse
+
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    book_ids = np.asarray(book_ids, dtype=np.int64)
+    books, book_index = np.unique(book_ids, return_inverse=True)
+    _, user_index = np.unique(user_ids, return_inverse=True)
+
+    reserved = sparse.csr_matrix(
+        (np.ones(len(book_index), dtype=np.float32), (user_index, book_index)),
+        shape=(user_index.max() + 1 if len(user_index) else 0, len(books)))
+    # Повторные бронирования одной книги считаются один раз
+    reserved.data[:] = 1
+
+    cooccurrence = (reserved.T @ reserved).tocsr()
+    norms = np.sqrt(cooccurrence.diagonal())
+    cooccurrence.setdiag(0)
+    cooccurrence.eliminate_zeros()
+    similarity = cooccurrence.tocoo()
+
+    scores = similarity.data / (norms[similarity.row] * norms[similarity.col])
+    # Сортировка по книге, затем по убыванию похожести; в каждой строке оставляем первые top_k
+    order = np.lexsort((-scores, similarity.row))
+    rows, cols, scores = similarity.row[order], similarity.col[order], scores[order]
+    row_starts = np.searchsorted(rows, np.arange(len(books)))
+    keep = np.arange(len(rows)) - row_starts[rows] < top_k
+    rows, cols, scores = rows[keep], cols[keep], scores[keep]
+
+    indptr = np.zeros(len(books) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(books)), out=indptr[1:])
+    return books, indptr, books[cols], scores.astype(np.float32)
+
+
+def rebuild(path=None, top_k=None):
+    """Пересчитывает рекомендации по таблице reservations и сохраняет их в файл."""
+    path = path or Config.RECOMMENDATIONS_PATH
+    top_k = top_k or Config.RECOMMENDATIONS_TOP_K
+
+    repo = get_repository()
+    if not repo:
+        raise RuntimeError("Ошибка подключения к базе данных")
+    try:
+        pairs = repo.list_reservation_pairs()
+    finally:
+        repo.close()
+
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    books, indptr, neighbours, scores = build_similar_books(pairs[:, 0], pairs[:, 1], top_k)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Запись во временный файл и переименование: воркеры не увидят файл наполовину
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, books=books, indptr=indptr, neighbours=neighbours, scores=scores)
+    os.replace(tmp_path, path)
+    return len(books)
+
+
+class SimilarBooks:
+    """Рекомендации в памяти; файл перечитывается, если job записал новую версию."""
+
+    def __init__(self, path, check_interval=60):
+        self.path = path
+        self.check_interval = check_interval
+        self._data = None
+        self._mtime = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with np.load(self.path) as f:
+                    self._data = {key: f[key] for key in ('books', 'indptr', 'neighbours', 'scores')}
+                self._mtime = mtime
+            except Exception:
+                logging.exception("Ошибка при загрузке рекомендаций.")
+
+    def get(self, book_id):
+        """Список (id книги, похожесть) в порядке убывания похожести."""
+        self._refresh()
+        data = self._data
+        if data is None:
+            return []
+        books = data['books']
+        i = np.searchsorted(books, book_id)
+        if i >= len(books) or books[i] != book_id:
+            return []
+        start, end = data['indptr'][i], data['indptr'][i + 1]
+        return [(int(b), float(s)) for b, s in zip(data['neighbours'][start:end], data['scores'][start:end])]
+
+
+similar_books = SimilarBooks(Config.RECOMMENDATIONS_PATH, Config.RECOMMENDATIONS_CHECK_INTERVAL)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    count = rebuild()
+    print(f"Рекомендации пересчитаны для {count} книг.")
@@ -0,0 +1,314 @@
+# repository.py
+
+from db import get_db_connection
+import logging
+
+BOOK_COLUMNS = "id, title, author, genre, publication_year, description, quantity, cover_image"
+
+# Пустой фильтр передается как NULL, иначе - шаблон для LIKE
+BOOK_FILTER = """
+    (%s IS NULL OR title LIKE %s)
+    AND (%s IS NULL OR author LIKE %s)
+    AND (%s IS NULL OR genre LIKE %s)
+"""
+
+# Все запросы приложения. Выполняются обычными (текстовыми) запросами: подготовленный
+# запрос mysql-connector перед каждым выполнением сбрасывает (COM_STMT_RESET), и это
+# второе обращение к серверу вместо одного (см. bench_statements.py).
+STATEMENTS = {
+    'user_by_username': "SELECT id, username, password, role FROM users WHERE username = %s",
+    'create_user': "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
+
+    'book_by_id': f"SELECT {BOOK_COLUMNS} FROM books WHERE id = %s",
+    'book_quantity': "SELECT quantity FROM books WHERE id = %s",
+    'count_books': f"SELECT COUNT(*) AS total FROM books WHERE {BOOK_FILTER}",
+    # В список книг попадает только начало описания, полное - на странице книги
+    'book_previews_page': f"""
+        SELECT id, title, author, genre, publication_year, quantity, cover_image,
+               LEFT(description, %s) AS description_preview,
+               CHAR_LENGTH(description) > %s AS description_truncated
+        FROM books
+        WHERE {BOOK_FILTER}
+        ORDER BY id
+        LIMIT %s OFFSET %s
+    """,
+    'book_quantity_for_update': "SELECT quantity FROM books WHERE id = %s FOR UPDATE",
+    'create_book_details': """
+        INSERT INTO books (title, author, genre, publication_year, description)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    'create_book': """
+        INSERT INTO books (title, author, genre, publication_year, description, quantity, cover_image)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """,
+    'update_book_details': """
+        UPDATE books
+        SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s
+        WHERE id = %s
+    """,
+    'update_book': """
+        UPDATE books
+        SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s, quantity = %s
+        WHERE id = %s
+    """,
+    'update_book_with_cover': """
+        UPDATE books
+        SET title = %s, author = %s, genre = %s, publication_year = %s, description = %s, quantity = %s, cover_image = %s
+        WHERE id = %s
+    """,
+    'delete_book': "DELETE FROM books WHERE id = %s",
+    'decrement_quantity': "UPDATE books SET quantity = quantity - 1 WHERE id = %s",
+    'increment_quantity': "UPDATE books SET quantity = quantity + 1 WHERE id = %s",
+
+    'create_reservation': "INSERT INTO reservations (user_id, book_id) VALUES (%s, %s)",
+    'reservation_for_update': "SELECT book_id, user_id, status FROM reservations WHERE id = %s FOR UPDATE",
+    'cancel_reservation': "UPDATE reservations SET status = 'canceled' WHERE id = %s",
+    'count_user_reservations': "SELECT COUNT(*) AS total FROM reservations WHERE user_id = %s",
+    'user_reservations': """
+        SELECT r.id, r.book_id, b.title, b.author, r.reservation_date, r.status
+        FROM reservations r
+        JOIN books b ON r.book_id = b.id
+        WHERE r.user_id = %s
+        ORDER BY r.reservation_date DESC, r.id DESC
+    """,
+    'user_reservations_page': """
+        SELECT r.id, r.book_id, b.title, b.author, r.reservation_date, r.status
+        FROM reservations r
+        JOIN books b ON r.book_id = b.id
+        WHERE r.user_id = %s
+        ORDER BY r.reservation_date DESC, r.id DESC
+        LIMIT %s OFFSET %s
+    """,
+    'book_history_page': """
+        SELECT id, action, user_id, quantity, created_at
+        FROM book_audit_log
+        WHERE book_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s OFFSET %s
+    """,
+    'all_reservations': """
+        SELECT r.id, u.username, b.title, b.author, r.reservation_date, r.status
+        FROM reservations r
+        JOIN users u ON r.user_id = u.id
+        JOIN books b ON r.book_id = b.id
+        ORDER BY r.reservation_date DESC
+    """,
+}
+
+
+class Repository:
+    """Доступ к данным библиотеки поверх одного соединения из пула."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _execute(self, name, params=()):
+        """Выполняет запрос на изменение и возвращает lastrowid."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(STATEMENTS[name], params)
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+
+    def _fetchall(self, name, params=()):
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.execute(STATEMENTS[name], params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _fetchone(self, name, params=()):
+        rows = self._fetchall(name, params)
+        return rows[0] if rows else None
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        # Незавершенная транзакция не должна вернуться в пул вместе с блокировками.
+        # Соединение возвращается в пул, даже если откат не удался (например, связь оборвалась)
+        try:
+            self.conn.rollback()
+        except Exception:
+            logging.exception("Ошибка при откате транзакции перед возвратом соединения в пул.")
+        finally:
+            self.conn.close()
+
+    # Пользователи
+
+    def get_user_by_username(self, username):
+        return self._fetchone('user_by_username', (username,))
+
+    def create_user(self, username, hashed_password, role='user'):
+        self._execute('create_user', (username, hashed_password, role))
+
+    # Книги
+
+    def search_books(self, title, author, genre):
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.callproc('search_books_proc', [title, author, genre])
+            books = []
+            for result in cursor.stored_results():
+                books = result.fetchall()
+            return books
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _book_filter_params(title, author, genre):
+        params = ()
+        for value in (title, author, genre):
+            value = value or None
+            params += (value, f"%{value}%" if value else None)
+        return params
+
+    def count_books(self, title, author, genre):
+        return self._fetchone('count_books', self._book_filter_params(title, author, genre))['total']
+
+    def list_book_previews(self, title, author, genre, preview_length, limit, offset=0):
+        """Страница каталога без полных описаний книг."""
+        params = (preview_length, preview_length) + self._book_filter_params(title, author, genre) + (limit, offset)
+        return self._fetchall('book_previews_page', params)
+
+    def get_book(self, book_id):
+        return self._fetchone('book_by_id', (book_id,))
+
+    def get_book_quantity(self, book_id):
+        row = self._fetchone('book_quantity', (book_id,))
+        return row['quantity'] if row else None
+
+    def create_book(self, title, author, genre, publication_year, description, quantity=None,
+                    cover_image=None):
+        if quantity is None:
+            # Количество и обложка берутся по умолчанию из схемы таблицы
+            return self._execute('create_book_details', (title, author, genre, publication_year, description))
+        return self._execute('create_book', (title, author, genre, publication_year, description,
+                                             quantity, cover_image))
+
+    def update_book_details(self, book_id, title, author, genre, publication_year, description):
+        self._execute('update_book_details', (title, author, genre, publication_year, description, book_id))
+
+    def update_book(self, book_id, title, author, genre, publication_year, description, quantity,
+                    cover_image=None):
+        if cover_image:
+            self._execute('update_book_with_cover', (title, author, genre, publication_year, description,
+                                                     quantity, cover_image, book_id))
+        else:
+            self._execute('update_book', (title, author, genre, publication_year, description,
+                                          quantity, book_id))
+
+    def delete_book(self, book_id):
+        self._execute('delete_book', (book_id,))
+
+    def list_books_by_ids(self, book_ids):
+        """Краткие данные книг (без описаний) в порядке book_ids; отсутствующие пропускаются."""
+        if not book_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(book_ids))
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT id, title, author, cover_image FROM books WHERE id IN ({placeholders})",
+                           tuple(book_ids))
+            books = {row['id']: row for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+        return [books[book_id] for book_id in book_ids if book_id in books]
+
+    def list_book_history(self, book_id, limit, offset=0):
+        return self._fetchall('book_history_page', (book_id, limit, offset))
+
+    # Бронирования
+
+    def reserve_book(self, user_id, book_id):
+        """Бронирует один экземпляр книги.
+
+        Возвращает результат в том же виде, что и reserve_books, плюс остаток экземпляров.
+        """
+        row = self._fetchone('book_quantity_for_update', (book_id,))
+        if not row:
+            return {'book_id': book_id, 'status': 'not_found'}
+        if row['quantity'] < 1:
+            return {'book_id': book_id, 'status': 'unavailable'}
+        self._execute('decrement_quantity', (book_id,))
+        reservation_id = self._execute('create_reservation', (user_id, book_id))
+        return {'book_id': book_id, 'status': 'reserved', 'reservation_id': reservation_id,
+                'quantity': row['quantity'] - 1}
+
+    def reserve_books(self, user_id, book_ids):
+        """Бронирует книги в рамках текущей транзакции.
+
+        Возвращает результат по каждой книге и оставшееся количество экземпляров.
+        """
+        unique_ids = tuple(set(book_ids))
+        placeholders = ', '.join(['%s'] * len(unique_ids))
+        cursor = self.conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"SELECT id, quantity FROM books WHERE id IN ({placeholders}) FOR UPDATE",
+                           unique_ids)
+            available = {row['id']: row['quantity'] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+        results = []
+        for book_id in book_ids:
+            if book_id not in available:
+                results.append({'book_id': book_id, 'status': 'not_found'})
+                continue
+            if available[book_id] < 1:
+                results.append({'book_id': book_id, 'status': 'unavailable'})
+                continue
+            self._execute('decrement_quantity', (book_id,))
+            reservation_id = self._execute('create_reservation', (user_id, book_id))
+            available[book_id] -= 1
+            results.append({'book_id': book_id, 'status': 'reserved', 'reservation_id': reservation_id})
+        return results, available
+
+    def cancel_reservation(self, reservation_id, user_id=None):
+        """Отменяет активное бронирование и возвращает экземпляр книги.
+
+        Если указан user_id, бронирование должно принадлежать этому пользователю.
+        Возвращает (статус, book_id, остаток экземпляров), статус - 'canceled',
+        'not_found' или 'inactive'.
+        """
+        reservation = self._fetchone('reservation_for_update', (reservation_id,))
+        if not reservation or (user_id is not None and reservation['user_id'] != user_id):
+            return 'not_found', None, None
+        if reservation['status'] != 'active':
+            return 'inactive', reservation['book_id'], None
+        self._execute('cancel_reservation', (reservation_id,))
+        self._execute('increment_quantity', (reservation['book_id'],))
+        return 'canceled', reservation['book_id'], self.get_book_quantity(reservation['book_id'])
+
+    def count_user_reservations(self, user_id):
+        return self._fetchone('count_user_reservations', (user_id,))['total']
+
+    def list_user_reservations(self, user_id, limit=None, offset=0):
+        if limit is None:
+            return self._fetchall('user_reservations', (user_id,))
+        return self._fetchall('user_reservations_page', (user_id, limit, offset))
+
+    def list_all_reservations(self):
+        return self._fetchall('all_reservations')
+
+    def list_reservation_pairs(self):
+        """Все пары (user_id, book_id) неотмененных бронирований для пересчета рекомендаций."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT user_id, book_id FROM reservations WHERE status <> 'canceled'")
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def get_repository():
+    """Возвращает Repository поверх соединения из пула или None, если база недоступна."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    return Repository(conn)
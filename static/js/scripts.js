@@ -23,3 +23,22 @@ paginationLinks.forEach(link => {
         }, 300); // Задержка перед переходом
     });
 });
+
+// Обновление количества экземпляров на странице без перезагрузки
+document.addEventListener('DOMContentLoaded', () => {
+    const container = document.querySelector('[data-availability-stream]');
+    if (!container || !window.EventSource) {
+        return;
+    }
+    const source = new EventSource(container.dataset.availabilityStream);
+    source.onmessage = (e) => {
+        const change = JSON.parse(e.data);
+        const row = container.querySelector(`[data-book-id="${change.book_id}"]`);
+        if (!row) {
+            return;
+        }
+        row.querySelector('.book-quantity').textContent = change.quantity;
+        row.querySelector('.reserve-form').classList.toggle('d-none', change.quantity <= 0);
+        row.querySelector('.unavailable-button').classList.toggle('d-none', change.quantity > 0);
+    };
+});
@@ -0,0 +1,63 @@
+# tests/test_admission.py
+
+import unittest
+
+from flask import Flask
+
+from admission import RateLimiter, init_admission_control
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_bucket_limits_key(self):
+        limiter = RateLimiter()
+        self.assertEqual(limiter.hit('user:1', 1, 2), 0)
+        self.assertEqual(limiter.hit('user:1', 1, 2), 0)
+        self.assertGreater(limiter.hit('user:1', 1, 2), 0)
+        self.assertEqual(limiter.hit('user:2', 1, 2), 0)
+
+    def test_least_recently_used_key_is_evicted(self):
+        limiter = RateLimiter(max_keys=3)
+        # Корзины не заполнены (rate=0), но размер все равно ограничен
+        for key in ('a', 'b', 'c'):
+            limiter.hit(key, 0, 5)
+        limiter.hit('a', 0, 5)
+        limiter.hit('d', 0, 5)
+        self.assertEqual(list(limiter._buckets), ['c', 'a', 'd'])
+
+    def test_size_stays_bounded(self):
+        limiter = RateLimiter(max_keys=100)
+        for i in range(1000):
+            limiter.hit(f"ip:{i}", 1, 10)
+        self.assertEqual(len(limiter._buckets), 100)
+
+
+class WorkerShareTest(unittest.TestCase):
+
+    def make_client(self, workers):
+        app = Flask(__name__)
+        app.config.update(
+            MAX_CONCURRENT_REQUESTS=10, PRIORITY_RESERVED_SLOTS=2, OVERLOAD_RETRY_AFTER=1,
+            RATE_LIMIT_PER_SECOND=0.001, RATE_LIMIT_BURST=6,
+            ANONYMOUS_RATE_LIMIT_PER_SECOND=0.001, ANONYMOUS_RATE_LIMIT_BURST=6,
+            RATE_LIMIT_WORKERS=workers,
+        )
+        app.add_url_rule('/', 'index', lambda: 'ok')
+        init_admission_control(app)
+        return app.test_client()
+
+    def admitted(self, client):
+        return sum(client.get('/').status_code == 200 for _ in range(10))
+
+    def test_single_process_gets_full_burst(self):
+        self.assertEqual(self.admitted(self.make_client(1)), 6)
+
+    def test_burst_is_divided_between_workers(self):
+        self.assertEqual(self.admitted(self.make_client(3)), 2)
+
+    def test_at_least_one_token_per_worker(self):
+        self.assertEqual(self.admitted(self.make_client(20)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# tests/test_api_reservations.py
+
+import unittest
+from unittest import mock
+
+import app as library
+from utils import hash_password
+
+USER = {'id': 7, 'username': 'reader', 'role': 'user', 'password': hash_password('secret')}
+
+
+class ReservationsApiTest(unittest.TestCase):
+
+    def setUp(self):
+        library.app.config.update(RATE_LIMIT_BURST=1000, ANONYMOUS_RATE_LIMIT_BURST=1000)
+        self.repo = mock.Mock()
+        self.repo.get_user_by_username.return_value = USER
+        patches = [
+            mock.patch.object(library, 'get_repository', return_value=self.repo),
+            mock.patch.object(library, 'audit_log'),
+            mock.patch.object(library, 'availability'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = library.app.test_client()
+        response = self.client.post('/api/login', json={'username': 'reader', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    def test_list(self):
+        self.repo.count_user_reservations.return_value = 12
+        self.repo.list_user_reservations.return_value = [{'id': 1, 'book_id': 3, 'status': 'active'}]
+        response = self.client.get('/api/reservations?page=2&limit=5', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual((body['total_reservations'], body['page'], body['total_pages']), (12, 2, 3))
+        self.repo.list_user_reservations.assert_called_once_with(7, 5, 5)
+
+    def test_create(self):
+        self.repo.reserve_books.return_value = (
+            [{'book_id': 3, 'status': 'reserved', 'reservation_id': 11}], {3: 0})
+        response = self.client.post('/api/reservations', json={'book_id': 3}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['reservation_id'], 11)
+        self.repo.reserve_books.assert_called_once_with(7, [3])
+        self.repo.commit.assert_called_once()
+        library.audit_log.record.assert_called_once_with(3, 'quantity', 7, 0)
+
+    def test_create_unavailable(self):
+        self.repo.reserve_books.return_value = ([{'book_id': 3, 'status': 'unavailable'}], {3: 0})
+        response = self.client.post('/api/reservations', json={'book_id': 3}, headers=self.headers)
+        self.assertEqual(response.status_code, 409)
+
+    def test_batch(self):
+        self.repo.reserve_books.return_value = (
+            [{'book_id': 3, 'status': 'reserved', 'reservation_id': 11},
+             {'book_id': 4, 'status': 'not_found'}], {3: 1})
+        response = self.client.post('/api/reservations/batch', json={'book_ids': [3, 4]},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['reserved'], 1)
+        self.repo.reserve_books.assert_called_once_with(7, [3, 4])
+
+    def test_batch_rejects_invalid_ids(self):
+        response = self.client.post('/api/reservations/batch', json={'book_ids': ['3']},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_cancel(self):
+        self.repo.cancel_reservation.return_value = ('canceled', 3, 2)
+        response = self.client.delete('/api/reservations/11', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.repo.cancel_reservation.assert_called_once_with(11, 7)
+        library.audit_log.record.assert_called_once_with(3, 'quantity', 7, 2)
+
+    def test_cancel_foreign_reservation(self):
+        self.repo.cancel_reservation.return_value = ('not_found', None, None)
+        response = self.client.delete('/api/reservations/11', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get('/api/reservations').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_audit.py
+
+import unittest
+from unittest import mock
+
+import audit
+from audit import AuditLog
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, operation, rows):
+        if self.conn.fail:
+            raise OSError('connection lost')
+        self.conn.pending.extend(rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = []
+        self.written = []
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.written.extend(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.closed = True
+
+
+class AuditWriteTest(unittest.TestCase):
+
+    def test_failed_batch_is_kept_for_retry(self):
+        broken, healthy = FakeConnection(fail=True), FakeConnection()
+        log = AuditLog()
+        batch = [(1, 'update', 7, 3, None)]
+        with mock.patch.object(audit, 'connect', side_effect=[broken, healthy]), \
+                self.assertLogs(level='ERROR'):
+            self.assertFalse(log._write(batch))
+            self.assertTrue(log._write(batch))
+        self.assertTrue(broken.closed)
+        self.assertEqual(healthy.written, batch)
+
+    def test_connection_is_reused(self):
+        conn = FakeConnection()
+        log = AuditLog()
+        with mock.patch.object(audit, 'connect', return_value=conn) as connect:
+            log._write([(1, 'create', 7, 1, None)])
+            log._write([(2, 'create', 7, 1, None)])
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(len(conn.written), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_recommendations.py
+
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from recommendations import SimilarBooks, build_similar_books
+
+
+def brute_force(pairs):
+    """Косинусная похожесть книг напрямую по множествам читателей: {книга: {книга: похожесть}}."""
+    readers = {}
+    for user_id, book_id in pairs:
+        readers.setdefault(book_id, set()).add(user_id)
+    similar = {}
+    for a in readers:
+        for b in readers:
+            common = len(readers[a] & readers[b])
+            if a != b and common:
+                similar.setdefault(a, {})[b] = common / math.sqrt(len(readers[a]) * len(readers[b]))
+    return similar
+
+
+def as_dict(books, indptr, neighbours, scores):
+    return {int(book): list(zip(neighbours[indptr[i]:indptr[i + 1]].tolist(),
+                                scores[indptr[i]:indptr[i + 1]].tolist()))
+            for i, book in enumerate(books)}
+
+
+class BuildSimilarBooksTest(unittest.TestCase):
+
+    def check(self, pairs, top_k):
+        users, books = zip(*pairs)
+        result = as_dict(*build_similar_books(users, books, top_k))
+        expected = brute_force(pairs)
+        self.assertEqual(sorted(result), sorted(set(books)))
+        for book, neighbours in result.items():
+            scores = [score for _, score in neighbours]
+            expected_scores = sorted(expected.get(book, {}).values(), reverse=True)[:top_k]
+            # Порядок среди равных оценок не задан, поэтому сравниваются оценки по позициям
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+            for neighbour, score in neighbours:
+                self.assertAlmostEqual(score, expected[book][neighbour], places=6)
+        return result
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        pairs = list(zip(rng.integers(0, 40, 400).tolist(), rng.integers(100, 160, 400).tolist()))
+        self.check(pairs, top_k=5)
+
+    def test_duplicate_reservations_count_once(self):
+        pairs = [(1, 10), (1, 10), (1, 10), (1, 20), (2, 20), (2, 30)]
+        result = self.check(pairs, top_k=10)
+        self.assertAlmostEqual(result[10][0][1], 1 / math.sqrt(2), places=6)
+
+    def test_truncated_to_top_k(self):
+        pairs = [(user, book) for user in range(5) for book in range(user, 8)]
+        result = self.check(pairs, top_k=3)
+        self.assertTrue(all(len(neighbours) <= 3 for neighbours in result.values()))
+        self.assertEqual(len(result[7]), 3)
+
+    def test_book_without_neighbours(self):
+        result = self.check([(1, 10), (2, 20)], top_k=5)
+        self.assertEqual(result, {10: [], 20: []})
+
+    def test_empty_input(self):
+        books, indptr, neighbours, scores = build_similar_books([], [], 5)
+        self.assertEqual(len(books), 0)
+        self.assertEqual(indptr.tolist(), [0])
+        self.assertEqual(len(neighbours), 0)
+        self.assertEqual(len(scores), 0)
+
+
+class SimilarBooksTest(unittest.TestCase):
+
+    def test_get_reads_saved_file(self):
+        pairs = [(1, 10), (1, 20), (2, 20), (2, 30)]
+        users, books = zip(*pairs)
+        built = build_similar_books(users, books, 5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'similar_books.npz')
+            np.savez(path, **dict(zip(('books', 'indptr', 'neighbours', 'scores'), built)))
+            similar = SimilarBooks(path)
+            self.assertEqual(sorted(book for book, _ in similar.get(20)), [10, 30])
+            self.assertEqual(similar.get(99), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+# tests/test_repository.py
+
+import unittest
+
+from repository import Repository
+
+
+class FakeCursor:
+    def __init__(self, conn, dictionary=False):
+        self.conn = conn
+        self.dictionary = dictionary
+        self.lastrowid = None
+        self.closed = False
+        self._rows = []
+
+    def execute(self, operation, params=()):
+        self.conn.executed.append((' '.join(operation.split()), params))
+        self._rows = self.conn.respond(operation, params)
+        self.conn.last_insert_id += 1
+        self.lastrowid = self.conn.last_insert_id
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Соединение-заглушка: ответы на запросы задаются словарем {фрагмент SQL: функция(params)}."""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.executed = []
+        self.cursors = []
+        self.last_insert_id = 0
+        self.closed = False
+
+    def cursor(self, dictionary=False):
+        cursor = FakeCursor(self, dictionary)
+        self.cursors.append(cursor)
+        return cursor
+
+    def respond(self, operation, params):
+        for fragment, response in self.responses.items():
+            if fragment in operation:
+                return response(params)
+        return []
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class StatementTest(unittest.TestCase):
+
+    def test_cursor_is_closed_after_each_query(self):
+        cnx = FakeConnection({'FROM books WHERE id': lambda params: [{'quantity': 2}]})
+        repo = Repository(cnx)
+        for _ in range(3):
+            self.assertEqual(repo.get_book_quantity(1), 2)
+        self.assertEqual(len(cnx.cursors), 3)
+        self.assertTrue(all(cursor.closed for cursor in cnx.cursors))
+
+    def test_insert_returns_lastrowid(self):
+        cnx = FakeConnection()
+        book_id = Repository(cnx).create_book('Title', 'Author', None, None, None)
+        self.assertEqual(book_id, cnx.last_insert_id)
+        self.assertTrue(cnx.cursors[0].closed)
+
+
+class ListBooksByIdsTest(unittest.TestCase):
+
+    def test_order_is_kept_and_missing_skipped(self):
+        cnx = FakeConnection({
+            'WHERE id IN': lambda params: [{'id': i, 'title': str(i)} for i in sorted(params) if i != 2],
+        })
+        books = Repository(cnx).list_books_by_ids([3, 2, 1])
+        self.assertEqual([book['id'] for book in books], [3, 1])
+
+    def test_empty(self):
+        cnx = FakeConnection()
+        self.assertEqual(Repository(cnx).list_books_by_ids([]), [])
+        self.assertEqual(cnx.executed, [])
+
+
+class ReserveBooksTest(unittest.TestCase):
+
+    def setUp(self):
+        stock = {1: 2, 2: 0, 3: 1}
+        self.cnx = FakeConnection({
+            'WHERE id IN': lambda params: [{'id': i, 'quantity': stock[i]} for i in params if i in stock],
+        })
+        self.repo = Repository(self.cnx)
+
+    def test_result_per_book(self):
+        results, available = self.repo.reserve_books(7, [1, 2, 99, 3, 3])
+        self.assertEqual([r['status'] for r in results],
+                         ['reserved', 'unavailable', 'not_found', 'reserved', 'unavailable'])
+        self.assertEqual(available, {1: 1, 2: 0, 3: 0})
+
+    def test_books_are_locked_once(self):
+        self.repo.reserve_books(7, [1, 1, 3])
+        locks = [sql for sql, _ in self.cnx.executed if 'FOR UPDATE' in sql]
+        self.assertEqual(len(locks), 1)
+        inserts = [params for sql, params in self.cnx.executed if sql.startswith('INSERT INTO reservations')]
+        self.assertEqual(inserts, [(7, 1), (7, 1), (7, 3)])
+
+
+class CancelReservationTest(unittest.TestCase):
+
+    def make_repo(self, reservation):
+        cnx = FakeConnection({
+            'FROM reservations WHERE id': lambda params: [reservation] if reservation else [],
+            'SELECT quantity FROM books': lambda params: [{'quantity': 4}],
+        })
+        return Repository(cnx), cnx
+
+    def test_cancel_active(self):
+        repo, cnx = self.make_repo({'book_id': 5, 'user_id': 7, 'status': 'active'})
+        self.assertEqual(repo.cancel_reservation(10, 7), ('canceled', 5, 4))
+        statements = [sql for sql, _ in cnx.executed]
+        self.assertTrue(any("SET status = 'canceled'" in sql for sql in statements))
+        self.assertTrue(any('quantity = quantity + 1' in sql for sql in statements))
+
+    def test_other_users_reservation_is_not_found(self):
+        repo, cnx = self.make_repo({'book_id': 5, 'user_id': 8, 'status': 'active'})
+        self.assertEqual(repo.cancel_reservation(10, 7), ('not_found', None, None))
+        self.assertEqual(len(cnx.executed), 1)
+
+    def test_admin_cancel_ignores_owner(self):
+        repo, _ = self.make_repo({'book_id': 5, 'user_id': 8, 'status': 'active'})
+        self.assertEqual(repo.cancel_reservation(10)[0], 'canceled')
+
+    def test_inactive(self):
+        repo, _ = self.make_repo({'book_id': 5, 'user_id': 7, 'status': 'canceled'})
+        self.assertEqual(repo.cancel_reservation(10, 7), ('inactive', 5, None))
+
+    def test_missing(self):
+        repo, _ = self.make_repo(None)
+        self.assertEqual(repo.cancel_reservation(10, 7)[0], 'not_found')
+
+
+class UserReservationsTest(unittest.TestCase):
+
+    def test_page_order_is_total(self):
+        # Бронирования одной пачки имеют одинаковое время, порядок страниц задает id
+        cnx = FakeConnection()
+        Repository(cnx).list_user_reservations(7, limit=10, offset=20)
+        sql, params = cnx.executed[0]
+        self.assertIn('ORDER BY r.reservation_date DESC, r.id DESC', sql)
+        self.assertEqual(params, (7, 10, 20))
+
+
+class CloseTest(unittest.TestCase):
+
+    def test_connection_returned_when_rollback_fails(self):
+        cnx = FakeConnection()
+
+        def broken_rollback():
+            raise OSError('connection lost')
+
+        cnx.rollback = broken_rollback
+        with self.assertLogs(level='ERROR'):
+            Repository(cnx).close()
+        self.assertTrue(cnx.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# wsgi.py
+#
+# Запуск в продакшене:
+#     python wsgi.py
+# Перезагрузка кода приложения без потери запросов: kill -HUP <pid мастер-процесса>.
+# Мастер не импортирует приложение: каждый воркер загружает его сам, поэтому
+# воркеры, запущенные после HUP, получают новый код. Настройки сервера (config.py)
+# мастер читает один раз - после их изменения нужен полный перезапуск.
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+from config import Config
+import logging
+
+
+def post_worker_init(worker):
+    # Лимиты запросов считаются в памяти каждого воркера и делятся между ними
+    worker.wsgi.config['RATE_LIMIT_WORKERS'] = worker.cfg.workers
+
+    # Каждый воркер создает свой пул соединений сразу после загрузки приложения;
+    # db импортируется здесь, потому что мастер приложение не загружает
+    import db
+    try:
+        db.init_db_pool()
+    except Exception as e:
+        # Пул будет создан при первом запросе
+        logging.error(f"Ошибка подключения к базе данных в воркере {worker.pid}: {e}")
+
+
+class LibraryApplication(BaseApplication):
+    """Gunicorn с настройками из Config; приложение загружается в воркерах по строке импорта."""
+
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # Вызывается в воркере после fork (в gevent-воркере - после monkey patching)
+        return import_app(self.application)
+
+
+def server_options():
+    options = {
+        'bind': Config.SERVER_BIND,
+        'workers': Config.SERVER_WORKERS,
+        'worker_class': Config.SERVER_WORKER_CLASS,
+        'max_requests': Config.SERVER_MAX_REQUESTS,
+        'max_requests_jitter': Config.SERVER_MAX_REQUESTS_JITTER,
+        'timeout': Config.SERVER_TIMEOUT,
+        'graceful_timeout': Config.SERVER_GRACEFUL_TIMEOUT,
+        'post_worker_init': post_worker_init,
+    }
+    if Config.SERVER_WORKER_CLASS == 'gthread':
+        options['threads'] = Config.SERVER_THREADS
+    else:
+        options['worker_connections'] = Config.SERVER_WORKER_CONNECTIONS
+    return options
+
+
+if __name__ == '__main__':
+    LibraryApplication('app:app', server_options()).run()